@@ -1,19 +1,56 @@
 from youtube_transcript_api import YouTubeTranscriptApi
-from reportlab.lib.pagesizes import letter
-from reportlab.platypus import SimpleDocTemplate, Paragraph
-from reportlab.lib.styles import getSampleStyleSheet
-import os
+import argparse
 from datetime import datetime
-import requests
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
+import functools
+import hashlib
 import json
+import inspect
+import io
+import re
+import sqlite3
+import sys
+import threading
+from urllib.parse import urlparse, parse_qs
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import numpy as np
+import orjson
 
  #ollama -> llama 3.2
 
+SUMMARIES_DIR = Path("summaries")
+TRANSCRIPTS_DIR = Path("transcripts")
+INDEXES_DIR = Path("indexes")
+SUMMARIES_DIR.mkdir(exist_ok=True)
+TRANSCRIPTS_DIR.mkdir(exist_ok=True)
+INDEXES_DIR.mkdir(exist_ok=True)
+
+# A 4-bit 3B model is several times faster per token than 8B FP16 and plenty for summaries
+DEFAULT_MODEL = "llama3.2:3b-instruct-q4_K_M"
+NUM_CTX = 8192  # Largest context window requested from Ollama; larger windows mean fewer chunks
+SYSTEM_PROMPT = (
+    "You are an expert summarizer. Provide only the summary content (do not include introductory phrases "
+    "like 'Here is a concise, accurate summary of the text:')."
+)
+OLLAMA_TIMEOUT = (2, 300)  # (connect, read) seconds, so a stuck server can't hang the script
+# Generation sends nothing until the request is dequeued and its prompt processed, which can
+# take many minutes for queued chunks on CPU, so streams only bound the connect time
+OLLAMA_STREAM_TIMEOUT = (2, None)
+
+# Reuse connections to the Ollama server across calls
+_SESSION = requests.Session()
+_SESSION.mount("http://", HTTPAdapter(pool_connections=8, pool_maxsize=8,
+                                      max_retries=Retry(total=2, backoff_factor=0.1)))
+
 
 def get_ollama_models():
     """Fetch list of available Ollama models"""
     try:
-        response = requests.get("http://localhost:11434/api/tags")
+        response = _SESSION.get("http://localhost:11434/api/tags", timeout=OLLAMA_TIMEOUT)
         if response.status_code == 200:
             models = [model["name"] for model in response.json()["models"]]
             return models
@@ -22,16 +59,27 @@ def get_ollama_models():
         return []
 
 
-def setup_ollama_summarizer(model_name="llama3"):
-    """Set up an Ollama-hosted summarization model"""
+def get_context_window(model_name):
+    """Context window to request for a model: NUM_CTX, capped at the model's own context length"""
     try:
-        response = requests.get("http://localhost:11434/api/tags")
-        if response.status_code != 200:
-            raise Exception("Ollama server not responding.")
+        response = _SESSION.post("http://localhost:11434/api/show", json={"model": model_name},
+                                 timeout=OLLAMA_TIMEOUT)
+        response.raise_for_status()
+        for key, value in response.json().get("model_info", {}).items():
+            if key.endswith(".context_length"):
+                return min(NUM_CTX, int(value))
+    except Exception:
+        pass
+    return NUM_CTX
+
 
-        available_models = get_ollama_models()
+def setup_ollama_summarizer(model_name=DEFAULT_MODEL, available_models=None, num_ctx=None):
+    """Set up an Ollama-hosted summarization model"""
+    try:
+        if available_models is None:
+            available_models = get_ollama_models()
         if not available_models:
-            print("No models found in Ollama. Please pull a model (e.g., 'ollama pull llama3').")
+            print(f"No models found in Ollama. Please pull a model (e.g., 'ollama pull {DEFAULT_MODEL}').")
             return None
 
         if model_name not in available_models:
@@ -39,34 +87,76 @@ def setup_ollama_summarizer(model_name="llama3"):
             print(f"Please pull the model with: 'ollama pull {model_name}'")
             return None
 
+        if num_ctx is None:
+            num_ctx = get_context_window(model_name)
         print(f"Ollama is running. Using model: {model_name}")
-        return lambda text, **kwargs: ollama_generate(text, model_name, **kwargs)
+        return lambda text, **kwargs: ollama_chat(text, model_name, num_ctx=num_ctx, **kwargs)
     except Exception as e:
         print(f"Error setting up Ollama summarizer: {str(e)}")
         return None
 
 
-def ollama_generate(prompt, model_name, max_new_tokens=120, min_length=20):
-    """Generate text using Ollama API with streaming support"""
-    payload = {
-        "model": model_name,
-        "prompt": prompt,
-        "max_tokens": max_new_tokens,
+def _ollama_options(max_new_tokens=120, num_ctx=NUM_CTX):
+    """Generation options sent with every request. Ollama reloads the model when runner
+    options such as num_ctx change, so the warm-up must send the same ones."""
+    return {
+        "num_predict": max_new_tokens,
+        "num_ctx": num_ctx,
         "temperature": 0.0  # Deterministic output
     }
+
+
+def warm_up_ollama(model_name, num_ctx=NUM_CTX):
+    """Ask Ollama to load the model into memory without generating anything"""
     try:
-        response = requests.post("http://localhost:11434/api/generate", json=payload, stream=True)
+        _SESSION.post("http://localhost:11434/api/generate",
+                      json={"model": model_name, "options": _ollama_options(num_ctx=num_ctx)},
+                      timeout=OLLAMA_TIMEOUT)
+    except Exception:
+        pass  # The first real request will load the model instead
+
+
+def ollama_stream(prompt, model_name, max_new_tokens=120, system=None, num_ctx=NUM_CTX):
+    """Yield response tokens from the Ollama API as they are generated.
+    With a system message the prompt is sent through /api/chat instead of /api/generate."""
+    payload = {
+        "model": model_name,
+        # Ollama ignores top-level max_tokens/temperature; generation settings go in options
+        "options": _ollama_options(max_new_tokens, num_ctx)
+    }
+    if system is None:
+        endpoint = "generate"
+        payload["prompt"] = prompt
+    else:
+        endpoint = "chat"
+        payload["messages"] = [{"role": "system", "content": system},
+                               {"role": "user", "content": prompt}]
+    # Read the body to the end (Ollama ends it right after the "done" line) so the
+    # connection goes back to the pool instead of being dropped
+    with _SESSION.post(f"http://localhost:11434/api/{endpoint}", json=payload, stream=True,
+                       timeout=OLLAMA_STREAM_TIMEOUT) as response:
         response.raise_for_status()  # Raise an exception for bad status codes
 
-        full_response = ""
-        for line in response.iter_lines():
-            if line:  # Skip empty lines
-                json_data = json.loads(line.decode('utf-8'))
-                if "response" in json_data:
-                    full_response += json_data["response"]
-                if json_data.get("done", False):
-                    break  # Stop when the response is complete
+        for line in response.iter_lines(chunk_size=8192):
+            if not line:  # Skip empty lines
+                continue
+            json_data = orjson.loads(line)
+            token = json_data.get("response") if system is None else json_data.get("message", {}).get("content")
+            if token:
+                yield token
+
 
+def ollama_generate(prompt, model_name, max_new_tokens=120, min_length=20, on_token=None, system=None,
+                    num_ctx=NUM_CTX):
+    """Generate text using Ollama API, passing each streamed token to on_token if given"""
+    try:
+        chunks = []
+        for token in ollama_stream(prompt, model_name, max_new_tokens, system, num_ctx):
+            chunks.append(token)
+            if on_token:
+                on_token(token)
+
+        full_response = "".join(chunks)
         if full_response:
             return full_response
         else:
@@ -75,12 +165,34 @@ def ollama_generate(prompt, model_name, max_new_tokens=120, min_length=20):
         raise Exception(f"Ollama API error: {str(e)}")
 
 
-def get_transcript_text(video_id, lang="en"):
-    """Get transcript as a single string"""
+def ollama_chat(user_msg, model_name, max_new_tokens=120, min_length=20, on_token=None, system=SYSTEM_PROMPT,
+                num_ctx=NUM_CTX):
+    """Generate a reply to user_msg under a fixed system message. Every call shares the same
+    system prefix, so Ollama can reuse its KV cache instead of re-processing the instructions."""
+    return ollama_generate(user_msg, model_name, max_new_tokens, min_length, on_token, system=system,
+                           num_ctx=num_ctx)
+
+
+def extract_video_id(video_url):
+    """Extract the video ID from a YouTube URL (watch, youtu.be, shorts, live, embed, nocookie embed) or a bare ID"""
+    if "://" not in video_url and any(domain in video_url for domain in ("youtube.com", "youtube-nocookie.com", "youtu.be")):
+        video_url = "https://" + video_url
+    url = urlparse(video_url)
+    if url.hostname == "youtu.be":
+        return url.path.strip("/")
+    if url.hostname and any(url.hostname == domain or url.hostname.endswith("." + domain)
+                            for domain in ("youtube.com", "youtube-nocookie.com")):
+        return parse_qs(url.query).get("v", [url.path.rstrip("/").rsplit("/", 1)[-1]])[0]
+    return video_url
+
+
+_TRANSCRIPT_API = YouTubeTranscriptApi()
+
+
+def get_transcript_entries(video_id, lang="en"):
+    """Get transcript as a list of {'text', 'start', 'duration'} entries"""
     try:
-        transcript = YouTubeTranscriptApi.get_transcript(video_id, languages=[lang])
-        full_text = " ".join(entry['text'] for entry in transcript)
-        return full_text
+        return _TRANSCRIPT_API.fetch(video_id, languages=[lang]).to_raw_data()
     except Exception as e:
         print(f"Error getting transcript: {str(e)}")
         return None
@@ -89,7 +201,7 @@ def get_transcript_text(video_id, lang="en"):
 def list_available_languages(video_id):
     """List available transcript languages"""
     try:
-        transcript_list = YouTubeTranscriptApi.list_transcripts(video_id)
+        transcript_list = _TRANSCRIPT_API.list(video_id)
         languages = [t.language_code for t in transcript_list]
         print(f"Available languages: {', '.join(languages)}")
         return languages
@@ -98,105 +210,355 @@ def list_available_languages(video_id):
         return []
 
 
+# Whole whitespace-delimited tokens only, so contractions, numbers and abbreviations stay intact
+_FILLER_RE = re.compile(r"(?<!\S)(?:um|uh|like|you|know|\S{1,2})(?!\S)", re.IGNORECASE)
+_WS_RE = re.compile(r"\s+")
+
+
 def clean_transcript(text):
-    """Remove noise from transcript"""
-    filler_words = {"um", "uh", "like", "you", "know"}
-    words = [word for word in text.split() if len(word) > 2 and word.lower() not in filler_words]
-    return " ".join(words)
+    """Remove noise from transcript text or a list of transcript entries"""
+    if not isinstance(text, str):
+        return clean_entries(text)
+    return _WS_RE.sub(" ", _FILLER_RE.sub("", text)).strip()
+
+
+def clean_entries(entries):
+    """Clean and join transcript entries in a single pass, without building the raw text first"""
+    buffer = io.StringIO()
+    for entry in entries:
+        buffer.write(_FILLER_RE.sub("", entry['text']))
+        buffer.write(" ")
+    return _WS_RE.sub(" ", buffer.getvalue()).strip()
+
+
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+")
+FALLBACK_WINDOW_TOKENS = 64
+_tokenizer = None
+
+
+def count_tokens(text):
+    """Count tokens with tiktoken if installed, otherwise estimate from the word count"""
+    global _tokenizer
+    if _tokenizer is None:
+        try:
+            import tiktoken
+            _tokenizer = tiktoken.get_encoding("cl100k_base")
+        except Exception:
+            _tokenizer = False
+    if _tokenizer:
+        return len(_tokenizer.encode(text))
+    return len(text.split()) * 4 // 3 + 1
+
+
+def chunk_transcript(text, max_tokens):
+    """Greedily pack whole sentences into chunks of at most max_tokens, repeating the
+    last sentence of each chunk at the start of the next for context"""
+    pieces = []
+    for sentence in _SENTENCE_RE.split(text):
+        n_tokens = count_tokens(sentence)
+        if n_tokens <= max_tokens:
+            pieces.append((sentence, n_tokens))
+            continue
+        # Auto-generated captions often have no punctuation; fall back to sentence-sized
+        # word windows, small enough that one can be carried over as overlap
+        words = sentence.split()
+        window_tokens = min(FALLBACK_WINDOW_TOKENS, max_tokens // 4)
+        step = max(1, len(words) * window_tokens // n_tokens)
+        for i in range(0, len(words), step):
+            window = " ".join(words[i:i + step])
+            pieces.append((window, count_tokens(window)))
+
+    chunks = []
+    current, current_tokens = [], 0
+    for sentence, n_tokens in pieces:
+        if current and current_tokens + n_tokens > max_tokens:
+            chunks.append(" ".join(current))
+            overlap, overlap_tokens = current[-1], count_tokens(current[-1])
+            if overlap_tokens + n_tokens <= max_tokens:
+                current, current_tokens = [overlap], overlap_tokens
+            else:
+                current, current_tokens = [], 0
+        current.append(sentence)
+        current_tokens += n_tokens
+    if current:
+        chunks.append(" ".join(current))
+    return chunks
+
+
+MAX_PARALLEL_CHUNKS = 4
+# Returned by llm_summarize instead of a summary; never cached
+SUMMARY_UNAVAILABLE = "Unable to summarize."
+SUMMARY_FAILED = "Summary generation failed."
+CACHE_PATH = SUMMARIES_DIR / ".cache.sqlite"
+SEMANTIC_CACHE_THRESHOLD = 0.95
+SEMANTIC_CACHE_MIN_COVERAGE = 0.9  # Share of passages that must match, and minimum passage-count ratio
+PASSAGE_TOKENS = 200
+PASSAGE_WORDS = 150  # Roughly PASSAGE_TOKENS, for plain-text transcripts
+_embedder = None
+
+
+def get_embedder():
+    """Load the sentence-embedding model once; None if sentence-transformers is missing"""
+    global _embedder
+    if _embedder is None:
+        try:
+            from sentence_transformers import SentenceTransformer
+            _embedder = SentenceTransformer("sentence-transformers/all-MiniLM-L6-v2")
+        except Exception:
+            _embedder = False
+    return _embedder or None
+
+
+def open_cache():
+    """Open the summary cache, creating the table on first use"""
+    conn = sqlite3.connect(CACHE_PATH)
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS cache(key TEXT PRIMARY KEY, summary TEXT, "
+        "lang TEXT, model TEXT, max_length INTEGER, embedding BLOB)"
+    )
+    return conn
+
+
+def embed_transcript(transcript, video_id, lang):
+    """Embed each passage of the transcript (text or entry list), one normalized float32 row per passage.
+    The embedding model truncates long inputs, so embedding the text in one go would only compare the intro.
+    Entry lists reuse the saved passage index, so each transcript is embedded only once."""
+    embedder = get_embedder()
+    if embedder is None:
+        return None
+    if not isinstance(transcript, str):
+        index = load_transcript_index(video_id, lang, transcript)
+        return index[1] if index is not None else None
+    words = transcript.split()
+    passages = [" ".join(words[i:i + PASSAGE_WORDS]) for i in range(0, len(words), PASSAGE_WORDS)]
+    return embedder.encode(passages, convert_to_numpy=True, normalize_embeddings=True).astype("float32")
+
+
+def transcripts_match(embeddings, other):
+    """True if two transcripts agree passage by passage: similar length, and nearly every passage
+    of each has a counterpart in the other. Averaging would hide differences between long videos."""
+    if min(len(embeddings), len(other)) < SEMANTIC_CACHE_MIN_COVERAGE * max(len(embeddings), len(other)):
+        return False
+    similarities = embeddings @ other.T
+    return ((similarities.max(axis=1) >= SEMANTIC_CACHE_THRESHOLD).mean() >= SEMANTIC_CACHE_MIN_COVERAGE
+            and (similarities.max(axis=0) >= SEMANTIC_CACHE_THRESHOLD).mean() >= SEMANTIC_CACHE_MIN_COVERAGE)
+
+
+def semantic_cached(func):
+    """Serve summaries from an exact (video_id, lang, model, max_length) cache, then a
+    near-duplicate transcript cache, and only call the LLM on a miss of both"""
+    @functools.wraps(func)
+    def wrapper(transcript_text, summarizer, max_length=120, min_length=20, *,
+                video_id=None, lang=None, model_name=None, on_token=None, query=None, num_ctx=NUM_CTX):
+        if not transcript_text or not summarizer or video_id is None:
+            return func(transcript_text, summarizer, max_length, min_length, on_token, query, num_ctx)
+
+        key_source = f"{video_id}|{lang}|{model_name}|{max_length}" + (f"|{query}" if query else "")
+        key = hashlib.sha256(key_source.encode("utf-8")).hexdigest()
+        embedding = None
+        try:
+            with closing(open_cache()) as conn, conn:
+                row = conn.execute("SELECT summary FROM cache WHERE key = ?", (key,)).fetchone()
+                if row:
+                    print("Using cached summary.")
+                    return row[0]
+
+                # Near matches must share lang and model so a different language or model never hits.
+                # Query-focused summaries only cover part of the transcript, so they are exact-match only.
+                if not query:
+                    embedding = embed_transcript(transcript_text, video_id, lang)
+                if embedding is not None:
+                    rows = conn.execute(
+                        "SELECT summary, embedding FROM cache WHERE lang = ? AND model = ? AND max_length = ? "
+                        "AND embedding IS NOT NULL", (lang, model_name, max_length)
+                    ).fetchall()
+                    for cached_summary, cached_embedding in rows:
+                        stored = np.frombuffer(cached_embedding, dtype="float32").reshape(-1, embedding.shape[1])
+                        if transcripts_match(embedding, stored):
+                            print("Using cached summary of a near-identical transcript.")
+                            return cached_summary
+        except Exception as e:
+            print(f"Summary cache unavailable: {str(e)}")
+
+        summary = func(transcript_text, summarizer, max_length, min_length, on_token, query, num_ctx)
+        if summary in (SUMMARY_UNAVAILABLE, SUMMARY_FAILED):
+            return summary
+
+        try:
+            with closing(open_cache()) as conn, conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO cache VALUES (?, ?, ?, ?, ?, ?)",
+                    (key, summary, lang, model_name, max_length,
+                     embedding.tobytes() if embedding is not None else None)
+                )
+        except Exception as e:
+            print(f"Could not update summary cache: {str(e)}")
+        return summary
+
+    # Keep the docstring from functools.wraps but report the wrapper's own parameters
+    wrapper.__signature__ = inspect.signature(wrapper, follow_wrapped=False)
+    return wrapper
+
+
+def split_passages(entries, max_tokens=PASSAGE_TOKENS):
+    """Group consecutive transcript entries into passages of about max_tokens tokens"""
+    passages = []
+    current, current_tokens = [], 0
+    for entry in entries:
+        n_tokens = count_tokens(entry['text'])
+        if current and current_tokens + n_tokens > max_tokens:
+            passages.append(" ".join(current))
+            current, current_tokens = [], 0
+        current.append(entry['text'])
+        current_tokens += n_tokens
+    if current:
+        passages.append(" ".join(current))
+    return passages
+
+
+def index_transcript(video_id, lang, entries):
+    """Embed the transcript's passages and save them under indexes/; None if no embedder is available"""
+    embedder = get_embedder()
+    if embedder is None:
+        return None
+    passages = split_passages(entries)
+    embeddings = embedder.encode(passages, convert_to_numpy=True, normalize_embeddings=True).astype("float32")
+    np.save(INDEXES_DIR / f"{video_id}_{lang}.npy", embeddings)
+    with open(INDEXES_DIR / f"{video_id}_{lang}.json", 'w', encoding='utf-8') as f:
+        json.dump(passages, f)
+    return passages, embeddings
+
+
+def load_transcript_index(video_id, lang, entries):
+    """Load the saved passage index for a transcript, building it on first use"""
+    index_path = INDEXES_DIR / f"{video_id}_{lang}.npy"
+    passages_path = INDEXES_DIR / f"{video_id}_{lang}.json"
+    if index_path.exists() and passages_path.exists():
+        with open(passages_path, encoding='utf-8') as f:
+            return json.load(f), np.load(index_path)
+    return index_transcript(video_id, lang, entries)
+
+
+def retrieve_passages(video_id, lang, entries, query, top_k=8):
+    """Return the top_k passages most similar to the query, in transcript order; None if retrieval is unavailable"""
+    try:
+        index = load_transcript_index(video_id, lang, entries)
+        if index is None:
+            return None
+        passages, embeddings = index
+        query_embedding = get_embedder().encode(query, normalize_embeddings=True).astype("float32")
+        best = sorted(np.argsort(embeddings @ query_embedding)[::-1][:top_k])
+        return " ".join(passages[i] for i in best)
+    except Exception as e:
+        print(f"Error retrieving passages: {str(e)}")
+        return None
 
 
-def llm_summarize(transcript_text, summarizer, max_length=120, min_length=20):
-    """Summarize the transcript using Ollama"""
+@semantic_cached
+def llm_summarize(transcript_text, summarizer, max_length=120, min_length=20, on_token=None, query=None,
+                  num_ctx=NUM_CTX):
+    """Summarize the transcript (text or entry list) using Ollama, streaming tokens of the final summary to on_token.
+    With a query, the summary covers only what the text says about it. num_ctx is the summarizer's
+    context window and sets the chunk size."""
     if not transcript_text or not summarizer:
-        return "Unable to summarize."
+        return SUMMARY_UNAVAILABLE
 
     try:
-        max_input_length = 4096  # Adjust if your model supports a different context window
+        # Leave room for the prompt and the generated summary
+        max_input_tokens = max(num_ctx - 512, num_ctx // 2)
         transcript_text = clean_transcript(transcript_text)
-        words = transcript_text.split()
+        focus = f" Only summarize what the text says about: {query}." if query else ""
 
+        # The summarizer supplies SYSTEM_PROMPT, so these only carry the task and the text
         prompt = (
-            "You are an expert summarizer. Provide only the summary content (do not include introductory phrases "
-            "like 'Here is a concise, accurate summary of the text:'). Create a concise, accurate summary of the "
-            "following text, focusing on main ideas and key details, omitting filler or redundant content:\n\n"
-            f"{transcript_text}\n\nSummary:"
+            "Create a concise, accurate summary of the following text, focusing on main ideas and key details, "
+            f"omitting filler or redundant content.{focus}\n\n{transcript_text}\n\nSummary:"
         )
         chunk_prompt_template = (
-            "You are an expert summarizer. Provide only the summary content (no introductory phrases). "
-            "Give a concise summary of the main points of the following text:\n\n"
+            "Give a concise summary of the main points of the following text.{focus}\n\n"
             "{chunk}\n\nSummary:"
         )
 
-        if len(words) > max_input_length - 100:
-            chunks = [" ".join(words[i:i + (max_input_length - 100)])
-                      for i in range(0, len(words), max_input_length - 100)]
-            intermediate_summaries = []
-            for chunk in chunks:
-                chunk_prompt = chunk_prompt_template.format(chunk=chunk)
-                summary = summarizer(chunk_prompt, max_new_tokens=100, min_length=20)
-                intermediate_summaries.append(summary)
+        if count_tokens(transcript_text) > max_input_tokens:
+            chunks = chunk_transcript(transcript_text, max_input_tokens)
+            # Chunks are independent, so send them concurrently; Ollama serves them in
+            # parallel when started with OLLAMA_NUM_PARALLEL > 1
+            with ThreadPoolExecutor(max_workers=MAX_PARALLEL_CHUNKS) as executor:
+                intermediate_summaries = list(executor.map(
+                    lambda chunk: summarizer(chunk_prompt_template.format(chunk=chunk, focus=focus),
+                                             max_new_tokens=100, min_length=20),
+                    chunks
+                ))
             final_input = " ".join(intermediate_summaries)
             final_prompt = (
-                "You are an expert summarizer. Provide only the summary content (no introductory phrases). "
-                "Combine these summaries into a single, precise summary:\n\n"
+                f"Combine these summaries into a single, precise summary.{focus}\n\n"
                 f"{final_input}\n\nSummary:"
             )
-            return summarizer(final_prompt, max_new_tokens=max_length, min_length=min_length)
+            return summarizer(final_prompt, max_new_tokens=max_length, min_length=min_length, on_token=on_token)
         else:
-            return summarizer(prompt, max_new_tokens=max_length, min_length=min_length)
+            return summarizer(prompt, max_new_tokens=max_length, min_length=min_length, on_token=on_token)
     except Exception as e:
         print(f"Error summarizing: {str(e)}")
-        return "Summary generation failed."
+        return SUMMARY_FAILED
 
 
 def save_summary_to_pdf(summary, video_id, lang):
-    """Save the summary to a PDF file"""
-    output_dir = "summaries"
-    if not os.path.exists(output_dir):
-        os.makedirs(output_dir)
+    """Save the summary to a PDF file and return its path"""
+    # Imported here so runs with --no-pdf skip loading ReportLab entirely
+    from reportlab.lib.pagesizes import letter
+    from reportlab.platypus import SimpleDocTemplate, Paragraph
+    from reportlab.lib.styles import getSampleStyleSheet
 
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    filename = f"{output_dir}/summary_{video_id}_{lang}_{timestamp}.pdf"
+    filename = SUMMARIES_DIR / f"summary_{video_id}_{lang}_{timestamp}.pdf"
 
-    try:
-        doc = SimpleDocTemplate(filename, pagesize=letter)
-        styles = getSampleStyleSheet()
-        style = styles['Normal']
-        summary = summary.replace('\n', '<br/>')
-        content = [Paragraph(f"Video ID: {video_id} - Language: {lang}", styles['Heading1']),
-                   Paragraph(summary, style)]
-        doc.build(content)
-        print(f"Summary saved to: {filename}")
-        return filename
-    except Exception as e:
-        print(f"Error saving PDF: {str(e)}")
-        return None
+    doc = SimpleDocTemplate(str(filename), pagesize=letter)
+    styles = getSampleStyleSheet()
+    style = styles['Normal']
+    summary = summary.replace('\n', '<br/>')
+    content = [Paragraph(f"Video ID: {video_id} - Language: {lang}", styles['Heading1']),
+               Paragraph(summary, style)]
+    doc.build(content)
+    return filename
+
+
+def save_transcript(entries, video_id, lang):
+    """Save the full transcript to a text file and return its path"""
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    filename = TRANSCRIPTS_DIR / f"transcript_{video_id}_{lang}_{timestamp}.txt"
+    with open(filename, 'w', encoding='utf-8') as f:
+        f.write(" ".join(entry['text'] for entry in entries))
+    return filename
 
 
 def main():
     """Main function to run the YouTube transcript summarizer with Ollama"""
+    parser = argparse.ArgumentParser(description="Summarize a YouTube video's transcript with Ollama")
+    parser.add_argument("--no-pdf", action="store_true", help="print the summary without saving it as a PDF")
+    parser.add_argument("--query", help="only summarize the parts of the video about this topic")
+    args = parser.parse_args()
+
     print("Checking Ollama server...")
     available_models = get_ollama_models()
     if not available_models:
         print(
-            "No models found. Please install a model (e.g., 'ollama pull llama3') and ensure the server is running ('ollama serve').")
+            f"No models found. Please install a model (e.g., 'ollama pull {DEFAULT_MODEL}') and ensure the server is running ('ollama serve').")
         return
 
     print(f"Available Ollama models: {', '.join(available_models)}")
-    ollama_model = input("Enter Ollama model name (e.g., llama3, mistral) [default: llama3]: ").strip() or "llama3:latest"
-    summarizer = setup_ollama_summarizer(ollama_model)
+    ollama_model = input(f"Enter Ollama model name (e.g., llama3, mistral) [default: {DEFAULT_MODEL}]: ").strip() or DEFAULT_MODEL
+    num_ctx = get_context_window(ollama_model)
+    summarizer = setup_ollama_summarizer(ollama_model, available_models=available_models, num_ctx=num_ctx)
     if not summarizer:
         print("Failed to initialize summarizer. Exiting.")
         return
 
+    # Load the model in the background while the user picks a video and language
+    # (daemon, so an early exit doesn't wait for the load to finish)
+    threading.Thread(target=warm_up_ollama, args=(ollama_model, num_ctx), daemon=True).start()
+
     video_url = input("Enter a YouTube video URL: ").strip()
-    if "youtube.com" in video_url or "youtu.be" in video_url:
-        if "v=" in video_url:
-            video_id = video_url.split("v=")[1].split("&")[0]
-        elif "youtu.be" in video_url:
-            video_id = video_url.split("/")[-1].split("?")[0]
-    else:
-        video_id = video_url
+    video_id = extract_video_id(video_url)
 
     available_langs = list_available_languages(video_id)
     if not available_langs:
@@ -204,24 +566,55 @@ def main():
         return
 
     lang = input(f"Pick a language code (like 'en', 'es', 'fr') from {', '.join(available_langs)}: ").strip()
-    transcript_text = get_transcript_text(video_id, lang)
-    if transcript_text:
+    transcript_entries = get_transcript_entries(video_id, lang)
+    if transcript_entries:
         print(f"\nGenerating summary with Ollama ({ollama_model})...")
-        summary = llm_summarize(transcript_text, summarizer)
-        print("\nSummary:")
-        print(summary)
-        pdf_filename = save_summary_to_pdf(summary, video_id, lang)
-
-        save = input("\nWould you like to save the full transcript too? (y/n): ").lower().strip()
-        if save == 'y':
-            output_dir = "transcripts"
-            if not os.path.exists(output_dir):
-                os.makedirs(output_dir)
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = f"{output_dir}/transcript_{video_id}_{lang}_{timestamp}.txt"
-            with open(filename, 'w', encoding='utf-8') as f:
-                f.write(transcript_text)
-            print(f"Transcript saved to: {filename}")
+        streamed = []
+
+        def print_token(token):
+            if not streamed:
+                print("\nSummary:")
+            streamed.append(token)
+            sys.stdout.write(token)
+            sys.stdout.flush()
+
+        transcript = transcript_entries
+        if args.query:
+            transcript = retrieve_passages(video_id, lang, transcript_entries, args.query)
+            if transcript is None:
+                if get_embedder() is None:
+                    print("Topic search needs sentence-transformers; summarizing the whole transcript instead.")
+                else:
+                    print("Summarizing the whole transcript instead.")
+                transcript = transcript_entries
+
+        summary = llm_summarize(transcript, summarizer, video_id=video_id, lang=lang,
+                                model_name=ollama_model, on_token=print_token, query=args.query,
+                                num_ctx=num_ctx)
+        if streamed:
+            print()
+        if summary != "".join(streamed):
+            print("\nSummary:")
+            print(summary)
+
+        # Write files in the background while the user reads the summary and answers the prompt.
+        # Results are printed here, not by the workers, so they don't land on the input prompt.
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            pdf_future = transcript_future = None
+            if not args.no_pdf:
+                pdf_future = executor.submit(save_summary_to_pdf, summary, video_id, lang)
+
+            save = input("\nWould you like to save the full transcript too? (y/n): ").lower().strip()
+            if save == 'y':
+                transcript_future = executor.submit(save_transcript, transcript_entries, video_id, lang)
+
+            if pdf_future:
+                try:
+                    print(f"Summary saved to: {pdf_future.result()}")
+                except Exception as e:
+                    print(f"Error saving PDF: {str(e)}")
+            if transcript_future:
+                print(f"Transcript saved to: {transcript_future.result()}")
 
 
 if __name__ == "__main__":